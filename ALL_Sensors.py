@@ -10,7 +10,11 @@ from bioreactor import Bioreactor
 from utils import (measure_and_write_sensor_data, create_csv_writer, 
                   setup_sensor_plot, update_sensor_plot)
 import threading
+import os
 from control import ring_light_thread
+from config import BioreactorConfig as cfg
+from pyramid import DownsamplePyramid, index_path
+from dashboard import Dashboard
 
 # Script start...
 duration: int = 259200  # 72 hrs
@@ -25,11 +29,19 @@ fig: Figure
 ax: Axes
 live_plots: List[Line2D]
 leg: plt.legend
-fig, ax, live_plots, leg = setup_sensor_plot()
+if cfg.LIVE_PLOT_ENABLED:
+    fig, ax, live_plots, leg = setup_sensor_plot()
 
 # Main data collection loop
-with open('data/251011_naive_galhis_ExP_ON_csm-his-leu-glu.csv', 'w', newline='') as csvfile, tqdm(total=duration, desc="Processing: ") as pbar, Bioreactor() as bioreactor:
-    writer = create_csv_writer(csvfile)
+data_path: str = 'data/251011_naive_galhis_ExP_ON_csm-his-leu-glu.csv'
+with open(data_path, 'w', newline='') as csvfile, tqdm(total=duration, desc="Processing: ") as pbar, Bioreactor(data_path) as bioreactor:
+    writer = create_csv_writer(csvfile, bioreactor.get_aux_fieldnames())
+    # Downsampled index for fast dashboard queries over the whole run
+    pyramid: DownsamplePyramid = DownsamplePyramid(writer.fieldnames[1:])
+    last_save: float = time.time()
+    if cfg.DASHBOARD_ENABLED:
+        dashboard: Dashboard = Dashboard(writer.fieldnames[1:], pyramid)
+        dashboard.start()
     start: float = time.time()
  #   ring_light_thread: threading.Thread = threading.Thread(target=ring_light_thread, daemon=True, args=(bioreactor, start))
  #   ring_light_thread.start()
@@ -39,11 +51,19 @@ with open('data/251011_naive_galhis_ExP_ON_csm-his-leu-glu.csv', 'w', newline=''
         pbar.update(elapsed - pbar.n)
         measurement_start: float = time.time()
         
-        data_row: List[float] = measure_and_write_sensor_data(bioreactor, writer, elapsed, csvfile)
+        data_row: List[float] = measure_and_write_sensor_data(bioreactor, writer, elapsed, csvfile, pyramid)
+        if cfg.DASHBOARD_ENABLED:
+            dashboard.publish(data_row)
+        
+        if time.time() - last_save > cfg.PYRAMID_SAVE_INTERVAL:
+            stat = os.stat(data_path)
+            pyramid.save(index_path(data_path), stat.st_size, stat.st_mtime)
+            last_save = time.time()
         
         # Update plot data
-        times.append(elapsed)
-        update_sensor_plot(fig, ax, live_plots, times, sensor_data, data_row)
+        if cfg.LIVE_PLOT_ENABLED:
+            times.append(elapsed)
+            update_sensor_plot(fig, ax, live_plots, times, sensor_data, data_row)
         
         # sets interval between measurements
         interval: int = 30
@@ -53,5 +73,9 @@ with open('data/251011_naive_galhis_ExP_ON_csm-his-leu-glu.csv', 'w', newline=''
 
         elapsed = time.time() - start
     
+    stat = os.stat(data_path)
+    pyramid.save(index_path(data_path), stat.st_size, stat.st_mtime)
+    if cfg.DASHBOARD_ENABLED:
+        dashboard.stop()
     print('Data recording complete. Terminating...')
     pbar.update(duration - pbar.n)
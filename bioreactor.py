@@ -1,4 +1,4 @@
-from typing import List, Tuple, Optional, Union
+from typing import List, Tuple, Optional, Union, Dict, Any
 import busio
 import board
 import adafruit_tca9548a
@@ -13,7 +13,9 @@ from config import BioreactorConfig as cfg
 import RPi.GPIO as IO
 from contextlib import contextmanager
 import time
+import threading
 import neopixel
+from stirrer import Stirrer
 
 # Configure logging using config
 logging.basicConfig(
@@ -28,8 +30,14 @@ logging.basicConfig(
 class Bioreactor():
     """Class to manage all sensors and operations for the bioreactor"""
     
-    def __init__(self) -> None:
-        """Initialize all sensors and store them as instance attributes"""
+    def __init__(self, data_path: Optional[str] = None) -> None:
+        """Initialize all sensors and store them as instance attributes
+
+        Args:
+            data_path: CSV file of the current run, used to name per-run logs
+                such as the dilution event log
+        """
+        self.data_path = data_path
         try:
             self.init_stream()
             self.init_leds()
@@ -39,6 +47,7 @@ class Bioreactor():
             self.init_int_temp_humid_press()
             self.init_ext_temp()
             self.init_atm_temp_press()
+            self.init_aux_sources()
         except OSError as e:
             logging.error(f"Hardware initialization error: {e}")
             raise
@@ -55,6 +64,8 @@ class Bioreactor():
         """Initialize the LEDs"""
         self.board_mode = cfg.LED_MODE.upper()
         self.pin = cfg.LED_PIN
+        # Serialises optical readings between the main loop and control threads
+        self.led_lock = threading.RLock()
         if self.board_mode == 'BOARD':
             IO.setmode(IO.BOARD)
         elif self.board_mode == 'BCM':
@@ -67,10 +78,8 @@ class Bioreactor():
     
     def init_stirrer(self) -> None:
         """Initialize the stirrer"""
-        IO.setup(cfg.STIRRER_PIN, IO.OUT)
-        self.stirrer = IO.PWM(cfg.STIRRER_PIN, cfg.STIRRER_SPEED)
-        self.stirrer.start(0)
-        self.stirrer.ChangeDutyCycle(cfg.DUTY_CYCLE)
+        self.stirrer = Stirrer.from_config(self.board_mode)
+        self.stirrer.ramp_to(cfg.DUTY_CYCLE, cfg.STIRRER_RAMP_TIME)
     
     def init_ring_light(self) -> None:
         """Initialize the ring light"""
@@ -123,6 +132,64 @@ class Bioreactor():
             )
         )
     
+    def init_aux_sources(self) -> None:
+        """Initialize optional auxiliary data sources (extra CSV columns)"""
+        self.aux_sources: List[Any] = []
+        try:
+            # Sources are registered before starting so a later failure can stop them
+            if cfg.LABJACK_ENABLED:
+                # Imported here so rigs without the LabJack driver still start
+                from labjack import LabJackU3Stream
+                self.labjack = LabJackU3Stream()
+                self.add_aux_source(self.labjack)
+                self.labjack.start()
+            if cfg.THERMAL_CONTROL_ENABLED:
+                from thermal import ThermalController
+                self.thermal = ThermalController(self)
+                self.add_aux_source(self.thermal)
+                self.thermal.start()
+            if cfg.DILUTION_ENABLED:
+                from dilution import DilutionController
+                self.dilution = DilutionController.from_bioreactor(self)
+                self.add_aux_source(self.dilution)
+                self.dilution.start()
+        except Exception:
+            self.stop_aux_sources()
+            raise
+
+    def add_aux_source(self, source: Any) -> None:
+        """Register a source whose readings are added to every data row
+
+        Args:
+            source: object with a `fieldnames` list, a `read()` method
+                returning a dict keyed by those fieldnames, and a `stop()`
+                method called from `finish()`
+        """
+        self.aux_sources.append(source)
+
+    def stop_aux_sources(self) -> None:
+        """Stop all auxiliary sources, carrying on past any that fail"""
+        for source in self.aux_sources:
+            try:
+                source.stop()
+            except Exception as e:
+                logging.error(f"Error stopping auxiliary source {type(source).__name__}: {e}")
+
+    def get_aux_fieldnames(self) -> List[str]:
+        """Get the CSV column names of all auxiliary sources"""
+        return [name for source in self.aux_sources for name in source.fieldnames]
+
+    def get_aux_data(self) -> Dict[str, float]:
+        """Get the readings of all auxiliary sources"""
+        data: Dict[str, float] = {}
+        for source in self.aux_sources:
+            try:
+                data.update(source.read())
+            except Exception as e:
+                logging.error(f"Error reading auxiliary source {type(source).__name__}: {e}")
+                data.update({name: float('nan') for name in source.fieldnames})
+        return data
+
     def led_on(self) -> None:
         """Turn on the LED"""
         IO.output(self.pin, 1)
@@ -135,6 +202,7 @@ class Bioreactor():
         """Change the color of the ring light"""
         if pixel is None:
             self.ring_light.fill(color)
+            self.ring_light_color = color
         else:
             self.ring_light[pixel] = color
         self.ring_light.show()
@@ -163,7 +231,8 @@ class Bioreactor():
     def finish(self) -> None:
         """Clean up LED resources"""
         IO.output(self.pin, 0)
-        self.stirrer.stop(0)
+        self.stirrer.stop()
+        self.stop_aux_sources()
         self.change_ring_light((0,0,0))
         IO.cleanup()
 
@@ -258,14 +327,15 @@ class Bioreactor():
     @contextmanager
     def led_context(self, settle_time: float = 1.0):
         """Context manager for LED control"""
-        try:
-            # Turn IR LEDs on and wait for signal to settle
-            self.led_on()
-            time.sleep(settle_time)
-            yield
-        finally:
-            # Turn IR LEDs off
-            self.led_off()
+        with self.led_lock:
+            try:
+                # Turn IR LEDs on and wait for signal to settle
+                self.led_on()
+                time.sleep(settle_time)
+                yield
+            finally:
+                # Turn IR LEDs off
+                self.led_off()
     
     @contextmanager
     def ring_light_measurement_context(self, settle_time: float = 1.0):
@@ -1,17 +1,20 @@
-from PWM_Motor import PWM_Motor, initialize_gpio, cleanup_gpio
+import os
+import sys
 import time
+import RPi.GPIO as IO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from thermal import PeltierDriver
 
+peltier = None
 try:
-        initialize_gpio()
-        peltier = PWM_Motor(24, 25, 3000)
+        IO.setmode(IO.BCM)
+        peltier = PeltierDriver.from_config('BCM')
         for i in [100]:
-                peltier.run(i, forward=True)
+                peltier.set_output(i)  # positive heats, negative cools
                 time.sleep(600)
-        # peltier.run(100, forward=True)  # Run at 50% power, forward direction
+        # peltier.set_output(-100)  # full cooling
         # time.sleep(5)  # Run for 5 seconds
-        # peltier.run(100, forward=False)  # Run at 50% power, forward direction
-        # time.sleep(5)  # Run for 5 seconds
-        peltier.stop()
 finally:
-        peltier.cleanup()
-        cleanup_gpio()
+        if peltier is not None:
+                peltier.stop()
+        IO.cleanup()
@@ -0,0 +1,314 @@
+"""Indexed catalog of recorded runs in `data/`
+
+Run metadata (date, organism, strain, medium and free tags parsed from the
+filename, plus schema, row count, duration and per-channel summary
+statistics from the file itself) is cached in a local SQLite database.
+`update()` only re-reads files that were added or changed since the last
+scan, so queries such as
+
+    catalog.find(strain='galhis', medium='csm-his-leu-glu', min_hours=48)
+
+answer from the index in milliseconds and return paths that go straight
+into `loader.load_run`.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import re
+import sqlite3
+import warnings
+from typing import List, Dict, Optional, NamedTuple, Any
+import numpy as np
+from config import BioreactorConfig as cfg
+from loader import Run, load_run, is_run_file
+
+# Filename tokens recognised as organisms and strains (strain -> organism)
+ORGANISMS: List[str] = ['yeast', 'ecoli', 'bacteria', 'chlamy']
+STRAINS: Dict[str, str] = {'w303': 'yeast', 'galhis': 'yeast'}
+# Media such as '0.1xypd', '0.1xypda', 'csm-his-leu-glu'
+MEDIUM_PATTERN = re.compile(r'^(\d*\.?\d+x)?(ypd|ypda|csm|sc|lb|m9)(-.*)?$', re.IGNORECASE)
+DATE_PATTERN = re.compile(r'^(\d{2})(\d{2})(\d{2})(-\d+)?$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    name TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    date TEXT,
+    organism TEXT,
+    strain TEXT,
+    medium TEXT,
+    tags TEXT,
+    schema TEXT,
+    columns TEXT,
+    rows INTEGER,
+    duration REAL,
+    start_time REAL
+);
+CREATE TABLE IF NOT EXISTS channels (
+    name TEXT,
+    channel TEXT,
+    min REAL,
+    max REAL,
+    mean REAL,
+    std REAL,
+    nan_count INTEGER,
+    PRIMARY KEY (name, channel)
+);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (date);
+CREATE INDEX IF NOT EXISTS runs_strain ON runs (strain);
+CREATE INDEX IF NOT EXISTS runs_medium ON runs (medium);
+CREATE INDEX IF NOT EXISTS runs_duration ON runs (duration);
+"""
+
+
+class RunInfo(NamedTuple):
+    """Catalog entry of one data file"""
+    path: str
+    date: Optional[str]
+    organism: Optional[str]
+    strain: Optional[str]
+    medium: Optional[str]
+    tags: List[str]
+    schema: str
+    columns: List[str]
+    rows: int
+    duration: float  # seconds
+
+    @property
+    def hours(self) -> float:
+        return self.duration / 3600
+
+
+def parse_filename(filename: str) -> Dict[str, Any]:
+    """Parse date, organism, strain, medium and remaining tags from a filename
+
+    e.g. '250922_naive_galhis_ExP_direct_csm-his-leu-glu.csv' gives date
+    2025-09-22, organism 'yeast', strain 'galhis', medium 'csm-his-leu-glu'
+    and tags ['naive', 'ExP', 'direct']. Multiple organisms or strains are
+    stored comma separated.
+    """
+    tokens = os.path.splitext(os.path.basename(filename))[0].split('_')
+    date: Optional[str] = None
+    organisms: List[str] = []
+    strains: List[str] = []
+    media: List[str] = []
+    tags: List[str] = []
+    for token in tokens:
+        match = DATE_PATTERN.match(token)
+        lower = token.lower()
+        if date is None and match:
+            try:
+                date = datetime.date(2000 + int(match[1]), int(match[2]), int(match[3])).isoformat()
+                continue
+            except ValueError:
+                pass
+        if lower in ORGANISMS:
+            organisms.append(lower)
+        elif lower in STRAINS:
+            strains.append(lower)
+            if STRAINS[lower] not in organisms:
+                organisms.append(STRAINS[lower])
+        elif MEDIUM_PATTERN.match(token):
+            media.append(lower)
+        elif token:
+            tags.append(token)
+    return {
+        'date': date,
+        'organism': ','.join(organisms) or None,
+        'strain': ','.join(strains) or None,
+        'medium': ','.join(media) or None,
+        'tags': tags
+    }
+
+
+def summarize(run: Run) -> Dict[str, Dict[str, float]]:
+    """Get per-channel min, max, mean, std and NaN count of a run"""
+    data = run.data
+    summary: Dict[str, Dict[str, float]] = {}
+    nan_count = np.isnan(data).sum(axis=0)
+    with warnings.catch_warnings():
+        # All-NaN channels (e.g. a disconnected sensor) give NaN statistics
+        warnings.simplefilter('ignore', RuntimeWarning)
+        stats = [np.nanmin, np.nanmax, np.nanmean, np.nanstd]
+        values = [f(data, axis=0) if len(data) else np.full(data.shape[1], np.nan) for f in stats]
+    for j, channel in enumerate(run.channels):
+        summary[channel] = {
+            'min': float(values[0][j]),
+            'max': float(values[1][j]),
+            'mean': float(values[2][j]),
+            'std': float(values[3][j]),
+            'nan_count': int(nan_count[j])
+        }
+    return summary
+
+
+def _null(value: float) -> Optional[float]:
+    return None if value is None or np.isnan(value) else value
+
+
+class RunCatalog():
+    """Class to index and query the runs in a data directory"""
+
+    def __init__(self, data_dir: str = 'data', db_path: Optional[str] = None) -> None:
+        self.data_dir = os.path.abspath(data_dir)
+        self.db_path = db_path if db_path is not None else os.path.join(self.data_dir, cfg.CATALOG_FILE)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def update(self) -> int:
+        """Index new or changed files and drop deleted ones
+
+        Returns:
+            int: number of files (re)indexed
+        """
+        known = {name: (size, mtime) for name, size, mtime in self.db.execute('SELECT name, size, mtime FROM runs')}
+        present = set()
+        indexed = 0
+        for entry in sorted(os.scandir(self.data_dir), key=lambda e: e.name):
+            # Sidecar directories (pyramids, dilution event logs) are not descended into
+            if not entry.is_file() or not is_run_file(entry.name):
+                continue
+            present.add(entry.name)
+            stat = entry.stat()
+            if known.get(entry.name) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                self._index(entry.name, stat)
+                indexed += 1
+            except Exception as e:
+                logging.warning(f"Catalog: could not index {entry.name}: {e}")
+        with self.db:
+            for name in set(known) - present:
+                self.db.execute('DELETE FROM runs WHERE name = ?', (name,))
+                self.db.execute('DELETE FROM channels WHERE name = ?', (name,))
+        return indexed
+
+    def _index(self, name: str, stat: os.stat_result) -> None:
+        run = load_run(os.path.join(self.data_dir, name))
+        meta = parse_filename(name)
+        if meta['date'] is None and run.start_time is not None:
+            meta['date'] = datetime.date.fromtimestamp(run.start_time).isoformat()
+        duration = float(run.time[-1] - run.time[0]) if len(run.time) else 0.0
+        with self.db:
+            self.db.execute('DELETE FROM channels WHERE name = ?', (name,))
+            self.db.execute(
+                'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    name, stat.st_size, stat.st_mtime, meta['date'], meta['organism'], meta['strain'],
+                    meta['medium'], json.dumps(meta['tags']),
+                    'current' if 'opt_dens1' in run.channels else 'legacy',
+                    json.dumps(run.channels), len(run.time), duration, run.start_time
+                )
+            )
+            self.db.executemany(
+                'INSERT INTO channels VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (name, channel, _null(s['min']), _null(s['max']), _null(s['mean']), _null(s['std']), s['nan_count'])
+                    for channel, s in summarize(run).items()
+                ]
+            )
+
+    def find(
+        self,
+        organism: Optional[str] = None,
+        strain: Optional[str] = None,
+        medium: Optional[str] = None,
+        tag: Optional[str] = None,
+        channel: Optional[str] = None,
+        min_hours: Optional[float] = None,
+        max_hours: Optional[float] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> List[RunInfo]:
+        """Find runs matching all of the given criteria, oldest first
+
+        Args:
+            organism, strain: match one of the (comma separated) values
+            medium: exact medium, e.g. 'csm-his-leu-glu'
+            tag: free filename tag, e.g. 'ExP'
+            channel: only runs that recorded this channel
+            min_hours, max_hours: bounds on the run duration
+            date_from, date_to: ISO dates (inclusive)
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value in (('organism', organism), ('strain', strain), ('medium', medium)):
+            if value is not None:
+                clauses.append(f"(',' || {column} || ',') LIKE ?")
+                params.append(f'%,{value.lower()},%')
+        if tag is not None:
+            clauses.append('tags LIKE ?')
+            params.append(f'%{json.dumps(tag)}%')
+        if channel is not None:
+            clauses.append('name IN (SELECT name FROM channels WHERE channel = ?)')
+            params.append(channel)
+        if min_hours is not None:
+            clauses.append('duration >= ?')
+            params.append(min_hours * 3600)
+        if max_hours is not None:
+            clauses.append('duration <= ?')
+            params.append(max_hours * 3600)
+        if date_from is not None:
+            clauses.append('date >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            clauses.append('date <= ?')
+            params.append(date_to)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        rows = self.db.execute(
+            'SELECT name, date, organism, strain, medium, tags, schema, columns, rows, duration FROM runs'
+            + where + ' ORDER BY date, name',
+            params
+        )
+        return [
+            RunInfo(
+                os.path.join(self.data_dir, name), date, organism, strain, medium,
+                json.loads(tags), schema, json.loads(columns), n_rows, duration
+            )
+            for name, date, organism, strain, medium, tags, schema, columns, n_rows, duration in rows
+        ]
+
+    def summary(self, path: str) -> Dict[str, Dict[str, float]]:
+        """Get the cached per-channel statistics of a run"""
+        rows = self.db.execute(
+            'SELECT channel, min, max, mean, std, nan_count FROM channels WHERE name = ?',
+            (os.path.basename(path),)
+        )
+        return {
+            channel: {'min': lo, 'max': hi, 'mean': mean, 'std': std, 'nan_count': nan_count}
+            for channel, lo, hi, mean, std, nan_count in rows
+        }
+
+    def load(self, info: RunInfo) -> Run:
+        """Load the data of a catalog entry"""
+        return load_run(info.path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index and search runs in data/')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--organism')
+    parser.add_argument('--strain')
+    parser.add_argument('--medium')
+    parser.add_argument('--tag')
+    parser.add_argument('--min-hours', type=float)
+    parser.add_argument('--max-hours', type=float)
+    args = parser.parse_args()
+    with RunCatalog(args.data_dir) as catalog:
+        print(f"Indexed {catalog.update()} new or changed files")
+        for info in catalog.find(args.organism, args.strain, args.medium, args.tag,
+                                 min_hours=args.min_hours, max_hours=args.max_hours):
+            print(f"{info.date or '?':10}  {info.hours:7.1f} h  {info.rows:6d} rows  {os.path.basename(info.path)}")
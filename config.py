@@ -23,6 +23,13 @@ class BioreactorConfig:
     # Sensor Arrays
     EXTERNAL_SENSOR_ORDER: list[int] = [3, 0, 2, 1]
     
+    # LabJack U3 Reference Thermometers
+    LABJACK_ENABLED: bool = False
+    LABJACK_CHANNELS: list[int] = [0, 1, 2, 3]
+    LABJACK_GAINS: list[float] = [3.15, 3.15, 1, 1]
+    LABJACK_SCAN_FREQUENCY: float = 1000  # scans per second
+    LABJACK_BUFFER_SECONDS: float = 120  # ring buffer length
+
     # I2C Multiplexer
     MUX_ADDRESS: int = 0x70
     
@@ -34,6 +41,67 @@ class BioreactorConfig:
     STIRRER_PIN: int = 35
     STIRRER_SPEED: int = 1000
     DUTY_CYCLE: int = 15
+    STIRRER_BACKEND: str = 'auto'  # 'hardware', 'dma', 'software' or 'auto'
+    STIRRER_RAMP_TIME: float = 5.0  # seconds to ramp up to DUTY_CYCLE at start
+    STIRRER_RAMP_INTERVAL: float = 0.1  # seconds between ramp steps
+
+    # Peltier Temperature Control
+    THERMAL_CONTROL_ENABLED: bool = False
+    PELTIER_HEAT_PIN: int = 18  # BCM 24
+    PELTIER_COOL_PIN: int = 22  # BCM 25
+    PELTIER_FREQUENCY: int = 3000
+    PELTIER_BACKEND: str = 'auto'
+    THERMAL_SETPOINT: float = 30.0  # °C
+    THERMAL_PERIOD: float = 1.0  # seconds between control updates
+    THERMAL_SENSOR: str = 'int'  # 'int' (BME280) or 'ext' (DS18B20)
+    THERMAL_SENSOR_INDICES: list[int] = [0, 1, 2, 3]
+    THERMAL_KP: float = 20.0
+    THERMAL_KI: float = 0.2
+    THERMAL_KD: float = 0.0
+    THERMAL_KFF: float = 0.0  # feed-forward gain on (setpoint - ambient)
+    THERMAL_RATE_LIMIT: float = 10.0  # max output change in % per second
+    THERMAL_MAX_TEMP: float = 45.0  # Peltier is switched off above this
+
+    # Dilution Control (turbidostat / chemostat)
+    DILUTION_ENABLED: bool = False
+    DILUTION_MODE: str = 'turbidostat'  # 'turbidostat' or 'chemostat'
+    DILUTION_OD_CHANNELS: list[int] = [0, 1, 2, 3]  # 180° through-beam opt_dens index per vial
+    DILUTION_OD_BLANK: list[float] | None = None  # through-beam volts of blank media; None = first reading
+    # OD band as log10(V_blank / V) of the through-beam channels
+    DILUTION_OD_LOW: list[float] = [0.3, 0.3, 0.3, 0.3]  # stop diluting below
+    DILUTION_OD_HIGH: list[float] = [0.4, 0.4, 0.4, 0.4]  # start diluting above
+    DILUTION_RATE: float = 0.2  # chemostat dilution rate in 1/h
+    DILUTION_CULTURE_VOLUME: float = 20.0  # ml per vial
+    DILUTION_DOSE: float = 0.3  # ml per pump event, must pump in less than DILUTION_PERIOD
+    DILUTION_PERIOD: float = 5.0  # seconds between fast optical readings
+    DILUTION_SETTLE_TIME: float = 0.2  # LED settle time for fast readings
+    DILUTION_FILTER_ALPHA: float = 0.3  # EWMA smoothing of the OD estimate
+    DILUTION_PUMP_PINS: list[int] = [11, 13, 15, 16]  # BCM 17, 27, 22, 23
+    DILUTION_PUMP_BACKEND: str = 'gpio'  # 'gpio' for on/off pumps or a PWM backend
+    DILUTION_PUMP_FREQUENCY: int = 1000
+    DILUTION_PUMP_DUTY: float = 100.0
+    DILUTION_PUMP_FLOW_RATES: list[float] = [0.1, 0.1, 0.1, 0.1]  # ml/s at DILUTION_PUMP_DUTY
+    DILUTION_EVENT_DIR: str = '.dilution'  # per-run pump event logs inside the data directory
+
+    # Downsampled Pyramid Index
+    PYRAMID_RESOLUTIONS: list[float] = [60, 600, 3600]  # bin widths in seconds
+    PYRAMID_DIR: str = '.pyramid'  # sidecar directory inside the data directory
+    PYRAMID_SAVE_INTERVAL: float = 600  # seconds between sidecar saves during a run
+
+    # Run Catalog
+    CATALOG_FILE: str = 'catalog.sqlite'  # SQLite index inside the data directory
+
+    # Multi-run Alignment
+    ALIGN_STEP: float = 60.0  # default common grid spacing in seconds
+    ALIGN_MAX_GAP: float = 300.0  # no interpolation across larger gaps
+
+    # Web Dashboard
+    DASHBOARD_ENABLED: bool = False
+    DASHBOARD_HOST: str = '0.0.0.0'
+    DASHBOARD_PORT: int = 8000
+    DASHBOARD_RECENT_ROWS: int = 2880  # 24 h of 30 s rows kept in memory
+    DASHBOARD_KEEPALIVE: float = 15.0  # seconds between SSE keepalives
+    LIVE_PLOT_ENABLED: bool = True  # matplotlib plot on the Pi's own display
 
     # Ring Light Configuration
     RING_LIGHT_COUNT: int = 32
@@ -0,0 +1,305 @@
+"""Lightweight local web dashboard with server-sent-event streaming
+
+The acquisition loop only calls `Dashboard.publish(data_row)`, which appends
+the row to a bounded deque and wakes the client threads; encoding and all
+network I/O happen in the HTTP server's own threads, and plotting happens in
+the browser. Endpoints:
+
+    /                      HTML page that renders the data client-side
+    /channels              JSON list of channel names
+    /history               decimated history per channel from the pyramid
+                           (?channels=a,b&points=800&start=s&end=s)
+    /recent                recent rows as JSON, or ?format=bin for
+                           little-endian float32 rows (columns in X-Columns)
+    /events                server-sent events, one compact JSON array per row
+"""
+import json
+import logging
+import math
+import threading
+from collections import deque
+from itertools import islice
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional, Sequence, Any
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from config import BioreactorConfig as cfg
+
+
+def _clean(values: Sequence[float]) -> List[Optional[float]]:
+    """Replace NaN/inf by None so the output is valid JSON"""
+    return [None if v is None or not math.isfinite(v) else round(float(v), 6) for v in values]
+
+
+class Dashboard():
+    """Class to serve live and historical run data to browsers"""
+
+    def __init__(
+        self,
+        channels: Sequence[str],
+        pyramid: Optional['DownsamplePyramid'] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        recent_rows: Optional[int] = None,
+        time_key: str = 'elapsed'
+    ) -> None:
+        """
+        Args:
+            channels: channel names, in the order rows are streamed
+            pyramid: downsampled index used for /history (optional)
+            host, port: address to listen on
+            recent_rows: number of rows kept in memory for /recent and reconnects
+            time_key: key of the time value in published rows
+        """
+        self.channels: List[str] = list(channels)
+        self.pyramid = pyramid
+        self.host = host if host is not None else cfg.DASHBOARD_HOST
+        self.port = port if port is not None else cfg.DASHBOARD_PORT
+        self.time_key = time_key
+        # Entries are [seq, values, encoded SSE message or None]
+        self.recent: deque = deque(maxlen=recent_rows if recent_rows is not None else cfg.DASHBOARD_RECENT_ROWS)
+        self.seq: int = 0
+        self.condition = threading.Condition()
+        self.stopping = threading.Event()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start serving in a background thread"""
+        handler = type('Handler', (DashboardHandler,), {'dashboard': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Dashboard serving on http://{self.host}:{self.port}/")
+
+    def stop(self) -> None:
+        """Disconnect clients and stop the server"""
+        self.stopping.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def publish(self, row: Dict[str, float]) -> None:
+        """Make a new data row available to clients (cheap; called from the acquisition loop)"""
+        values = [row.get(self.time_key, float('nan'))] + [row.get(name, float('nan')) for name in self.channels]
+        with self.condition:
+            self.seq += 1
+            self.recent.append([self.seq, values, None])
+            self.condition.notify_all()
+
+    def rows_since(self, seq: int) -> List[list]:
+        """Get the buffered entries newer than `seq`"""
+        with self.condition:
+            if not self.recent or self.recent[-1][0] <= seq:
+                return []
+            # Walk back from the newest entry so only the new rows are copied
+            newer = min(len(self.recent), self.recent[-1][0] - seq)
+            entries = list(islice(reversed(self.recent), newer))
+        entries.reverse()
+        return entries
+
+    def encode_event(self, entry: list) -> bytes:
+        """Encode an entry as an SSE message, once, however many clients read it"""
+        if entry[2] is None:
+            data = json.dumps(_clean(entry[1]), separators=(',', ':'))
+            entry[2] = f"id: {entry[0]}\ndata: {data}\n\n".encode()
+        return entry[2]
+
+    def history(
+        self,
+        channels: Sequence[str],
+        points: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Get decimated history per channel
+
+        Uses the pyramid's min/max/mean aggregates if available, otherwise
+        strides through the in-memory recent rows.
+        """
+        result: Dict[str, Any] = {}
+        if self.pyramid is not None:
+            for name in channels:
+                if name not in self.pyramid.lookup:
+                    continue
+                q = self.pyramid.query(name, start, end, points)
+                result[name] = {key: _clean(q[key]) for key in ('time', 'mean', 'min', 'max')}
+            return result
+        with self.condition:
+            rows = np.array([entry[1] for entry in self.recent], dtype=float).reshape(-1, len(self.channels) + 1)
+        if start is not None:
+            rows = rows[rows[:, 0] >= start]
+        if end is not None:
+            rows = rows[rows[:, 0] <= end]
+        rows = rows[::max(1, int(math.ceil(len(rows) / max(1, points))))]
+        for name in channels:
+            if name in self.channels:
+                column = rows[:, self.channels.index(name) + 1]
+                result[name] = {'time': _clean(rows[:, 0]), 'mean': _clean(column)}
+        return result
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """Request handler; `dashboard` is set on a per-server subclass"""
+
+    dashboard: Dashboard
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"Dashboard {self.address_string()}: {format % args}")
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/':
+                self._send(PAGE.encode(), 'text/html; charset=utf-8')
+            elif url.path == '/channels':
+                self._send_json(self.dashboard.channels)
+            elif url.path == '/history':
+                channels = query['channels'].split(',') if query.get('channels') else self.dashboard.channels
+                self._send_json(self.dashboard.history(
+                    channels,
+                    int(query.get('points', 800)),
+                    float(query['start']) if 'start' in query else None,
+                    float(query['end']) if 'end' in query else None
+                ))
+            elif url.path == '/recent':
+                self._recent(int(query.get('since', 0)), query.get('format', 'json'))
+            elif url.path == '/events':
+                # New clients get history from /history, so only stream rows from now on
+                since = self.headers.get('Last-Event-ID') or query.get('since')
+                self._events(int(since) if since is not None else self.dashboard.seq)
+            else:
+                self.send_error(404)
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send(self, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj: Any) -> None:
+        self._send(json.dumps(obj, separators=(',', ':')).encode(), 'application/json')
+
+    def _recent(self, since: int, fmt: str) -> None:
+        entries = self.dashboard.rows_since(since)
+        last = entries[-1][0] if entries else since
+        columns = [self.dashboard.time_key] + self.dashboard.channels
+        if fmt == 'bin':
+            rows = np.array([entry[1] for entry in entries], dtype='<f4').reshape(-1, len(columns))
+            self._send(rows.tobytes(), 'application/octet-stream',
+                       {'X-Columns': ','.join(columns), 'X-Last-Seq': str(last)})
+        else:
+            self._send_json({'columns': columns, 'seq': last, 'rows': [_clean(entry[1]) for entry in entries]})
+
+    def _events(self, last: int) -> None:
+        dashboard = self.dashboard
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        self.wfile.write(b"retry: 5000\n\n")
+        self.wfile.flush()
+        while not dashboard.stopping.is_set():
+            with dashboard.condition:
+                dashboard.condition.wait_for(
+                    lambda: dashboard.stopping.is_set() or dashboard.seq > last,
+                    timeout=cfg.DASHBOARD_KEEPALIVE
+                )
+            entries = dashboard.rows_since(last)
+            if entries:
+                self.wfile.write(b''.join(dashboard.encode_event(entry) for entry in entries))
+                last = entries[-1][0]
+            else:
+                self.wfile.write(b": keepalive\n\n")
+            self.wfile.flush()
+
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Bioreactor</title>
+<style>
+body{font-family:sans-serif;margin:0;display:flex;height:100vh}
+#side{width:200px;overflow-y:auto;padding:8px;font-size:13px;border-right:1px solid #ccc}
+#main{flex:1;display:flex;flex-direction:column}
+canvas{flex:1;width:100%}
+#status{padding:4px 8px;font-size:12px;color:#666}
+</style></head>
+<body>
+<div id="side"></div>
+<div id="main"><canvas id="plot"></canvas><div id="status">connecting...</div></div>
+<script>
+const colors=['#1f77b4','#ff7f0e','#2ca02c','#d62728','#9467bd','#8c564b','#e377c2','#7f7f7f','#bcbd22','#17becf'];
+let channels=[], series={}, shown=new Set(['opt_dens1']);
+const canvas=document.getElementById('plot'), ctx=canvas.getContext('2d');
+
+async function init(){
+  channels=await (await fetch('/channels')).json();
+  const side=document.getElementById('side');
+  channels.forEach(name=>{
+    const label=document.createElement('label'), box=document.createElement('input');
+    box.type='checkbox'; box.checked=shown.has(name);
+    box.onchange=()=>{box.checked?shown.add(name):shown.delete(name); load();};
+    label.append(box,' '+name); side.append(label,document.createElement('br'));
+  });
+  await load();
+  const events=new EventSource('/events');
+  events.onmessage=e=>{
+    const row=JSON.parse(e.data);
+    channels.forEach((name,i)=>{ if(series[name]){series[name].time.push(row[0]); series[name].mean.push(row[i+1]);} });
+    document.getElementById('status').textContent='t = '+(row[0]/3600).toFixed(2)+' h';
+    draw();
+  };
+  events.onerror=()=>{document.getElementById('status').textContent='reconnecting...';};
+}
+
+async function load(){
+  const names=[...shown].join(',');
+  series=names?await (await fetch('/history?points='+canvas.clientWidth+'&channels='+names)).json():{};
+  draw();
+}
+
+function draw(){
+  canvas.width=canvas.clientWidth; canvas.height=canvas.clientHeight;
+  ctx.clearRect(0,0,canvas.width,canvas.height);
+  let x0=Infinity,x1=-Infinity,y0=Infinity,y1=-Infinity;
+  for(const s of Object.values(series)){
+    s.time.forEach((t,i)=>{ if(t===null) return; x0=Math.min(x0,t); x1=Math.max(x1,t);
+      for(const v of [s.mean[i],s.min&&s.min[i],s.max&&s.max[i]]) if(v!==null&&v!==undefined){y0=Math.min(y0,v); y1=Math.max(y1,v);} });
+  }
+  if(!isFinite(x0)) return;
+  if(x1===x0) x1=x0+1; if(y1===y0) y1=y0+1;
+  const pad=40, W=canvas.width-2*pad, H=canvas.height-2*pad;
+  const X=t=>pad+(t-x0)/(x1-x0)*W, Y=v=>pad+H-(v-y0)/(y1-y0)*H;
+  ctx.fillStyle='#000'; ctx.font='11px sans-serif';
+  ctx.fillText(y1.toPrecision(4),2,pad); ctx.fillText(y0.toPrecision(4),2,pad+H);
+  ctx.fillText((x0/3600).toFixed(2)+' h',pad,canvas.height-8); ctx.fillText((x1/3600).toFixed(2)+' h',pad+W-40,canvas.height-8);
+  Object.entries(series).forEach(([name,s],k)=>{
+    const c=colors[channels.indexOf(name)%colors.length];
+    if(s.min){ ctx.fillStyle=c+'33';
+      s.time.forEach((t,i)=>{ if(i<s.min.length&&s.min[i]!==null) ctx.fillRect(X(t)-1,Y(s.max[i]),2,Y(s.min[i])-Y(s.max[i])+1); }); }
+    ctx.strokeStyle=c; ctx.beginPath(); let pen=false;
+    s.time.forEach((t,i)=>{ const v=s.mean[i]; if(v===null){pen=false; return;}
+      pen?ctx.lineTo(X(t),Y(v)):ctx.moveTo(X(t),Y(v)); pen=true; });
+    ctx.stroke(); ctx.fillStyle=c; ctx.fillText(name,pad+8,pad+14*(k+1));
+  });
+}
+window.onresize=draw;
+init();
+</script>
+</body></html>
+"""
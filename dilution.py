@@ -0,0 +1,434 @@
+"""Turbidostat / chemostat dilution control driven by live optical density
+
+`simulate()` runs the controller against a logistic growth model without
+any hardware; `python dilution.py` checks that the turbidostat holds the
+configured OD band in simulation.
+"""
+import csv
+import logging
+import math
+import os
+import threading
+import time
+from typing import List, Dict, Optional, Callable, Sequence
+import numpy as np
+from config import BioreactorConfig as cfg
+
+
+def event_log_path(data_path: str) -> str:
+    """Get the pump event log path of a run's data file
+
+    Logs live in a subdirectory of the data directory so that catalog and
+    pyramid scans of `data/` do not mistake them for runs.
+    """
+    directory, name = os.path.split(os.path.abspath(data_path))
+    return os.path.join(directory, cfg.DILUTION_EVENT_DIR, os.path.splitext(name)[0] + '.csv')
+
+
+def absorbance(voltage: Sequence[float], blank: Sequence[float]) -> np.ndarray:
+    """Convert through-beam photodiode voltages to OD, log10(V_blank / V)
+
+    The 180° photodiodes (`opt_dens1`-`opt_dens4`) receive less light as the
+    culture grows, so their voltage falls with density; the result rises with
+    it and is 0 for the blank. Non-positive readings give NaN.
+    """
+    voltage = np.asarray(voltage, dtype=float)
+    blank = np.asarray(blank, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(voltage > 0, np.log10(blank / voltage), np.nan)
+
+
+class Pump():
+    """Class to dispense a volume of media through a GPIO or PWM output"""
+
+    def __init__(self, output: 'PWMOutput', flow_rate: float, duty: float = 100.0) -> None:
+        """
+        Args:
+            output: output driving the pump
+            flow_rate: calibrated flow in ml/s at `duty`
+            duty: duty cycle used while pumping (0-100 %)
+        """
+        self.output = output
+        self.flow_rate = flow_rate
+        self.duty = duty
+        self.timer: Optional[threading.Timer] = None
+
+    @property
+    def busy(self) -> bool:
+        """True while a dispense is in progress"""
+        return self.timer is not None and self.timer.is_alive()
+
+    def dispense(self, volume: float) -> float:
+        """Switch the pump on for long enough to deliver `volume` ml
+
+        Returns immediately; a timer switches the pump off again.
+
+        Returns:
+            float: the volume that will be delivered (0 if the pump was busy)
+        """
+        if self.busy or volume <= 0:
+            return 0.0
+        self.output.set_duty(self.duty)
+        self.timer = threading.Timer(volume / self.flow_rate, self.output.set_duty, args=(0,))
+        self.timer.daemon = True
+        self.timer.start()
+        return volume
+
+    def stop(self) -> None:
+        """Abort any dispense and switch the pump off"""
+        if self.timer is not None:
+            self.timer.cancel()
+        self.output.stop()
+
+
+class DilutionController():
+    """Class to hold each vial in an OD band (turbidostat) or at a fixed dilution rate (chemostat)
+
+    Every `period` seconds the controller takes one fast optical reading,
+    updates an exponentially weighted OD estimate per vial and decides on
+    dilution straight away, so pumps react within one optical cycle rather
+    than at the next full data row.
+
+    In 'turbidostat' mode a vial starts diluting when its filtered OD rises
+    above `od_high` and receives one dose per cycle until it falls below
+    `od_low`. In 'chemostat' mode each vial is dosed whenever the volume owed
+    at `dilution_rate` (1/h) reaches one dose. A dose that finds its pump
+    still running is added to the pump's next dispense, so doses should take
+    less than `period` seconds to pump for dilution to keep up.
+
+    Pump events are appended to `event_log` (CSV) and the filtered OD,
+    cumulative pumped volume and realised dilution rate of each vial are
+    logged into the main data stream as an auxiliary source.
+    """
+
+    def __init__(
+        self,
+        read_od: Callable[[], Sequence[float]],
+        pumps: List[Pump],
+        mode: Optional[str] = None,
+        od_low: Optional[Sequence[float]] = None,
+        od_high: Optional[Sequence[float]] = None,
+        dilution_rate: Optional[float] = None,
+        culture_volume: Optional[float] = None,
+        dose: Optional[float] = None,
+        period: Optional[float] = None,
+        alpha: Optional[float] = None,
+        event_log: Optional[str] = None,
+        clock: Callable[[], float] = time.time
+    ) -> None:
+        """
+        Args:
+            read_od: callable returning one OD reading per vial, rising with density
+            pumps: one pump per vial
+            mode: 'turbidostat' or 'chemostat'
+            od_low, od_high: per-vial OD band, in the units of `read_od`
+            dilution_rate: chemostat dilution rate in 1/h
+            culture_volume: culture volume per vial in ml
+            dose: volume per pump event in ml
+            period: seconds between optical readings
+            alpha: smoothing factor of the OD filter (1 = no filtering)
+            event_log: path of a CSV file pump events are appended to
+            clock: time source, replaced by the simulation clock in tests
+        """
+        self.read_od = read_od
+        self.pumps = pumps
+        self.vials = len(pumps)
+        self.mode = (mode if mode is not None else cfg.DILUTION_MODE).lower()
+        if self.mode not in ('turbidostat', 'chemostat'):
+            raise ValueError("Invalid dilution mode: use 'turbidostat' or 'chemostat'")
+        self.od_low = np.asarray(od_low if od_low is not None else cfg.DILUTION_OD_LOW, dtype=float)
+        self.od_high = np.asarray(od_high if od_high is not None else cfg.DILUTION_OD_HIGH, dtype=float)
+        self.dilution_rate = dilution_rate if dilution_rate is not None else cfg.DILUTION_RATE
+        self.culture_volume = culture_volume if culture_volume is not None else cfg.DILUTION_CULTURE_VOLUME
+        self.dose = dose if dose is not None else cfg.DILUTION_DOSE
+        self.period = period if period is not None else cfg.DILUTION_PERIOD
+        self.alpha = alpha if alpha is not None else cfg.DILUTION_FILTER_ALPHA
+        self.clock = clock
+        self.fieldnames: List[str] = (
+            [f'od_filt{i+1}' for i in range(self.vials)]
+            + [f'pumped_ml{i+1}' for i in range(self.vials)]
+            + [f'dil_rate{i+1}' for i in range(self.vials)]
+        )
+
+        self.od_filtered = np.full(self.vials, np.nan)
+        self.diluting = np.zeros(self.vials, dtype=bool)
+        self.owed = np.zeros(self.vials)  # chemostat volume not yet dispensed
+        self.pumped = np.zeros(self.vials)  # cumulative volume per vial
+        self.pumped_at_read = np.zeros(self.vials)
+        self.last_step: Optional[float] = None
+        self.last_read: Optional[float] = None
+        self.events: List[Dict[str, float]] = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+        self.event_file = None
+        self.event_writer: Optional[csv.DictWriter] = None
+        if event_log is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(event_log)), exist_ok=True)
+            new_file = not os.path.exists(event_log) or os.path.getsize(event_log) == 0
+            self.event_file = open(event_log, 'a', newline='')
+            self.event_writer = csv.DictWriter(
+                self.event_file, fieldnames=['time', 'vial', 'volume_ml', 'od_filt', 'mode']
+            )
+            if new_file:
+                self.event_writer.writeheader()
+
+    @classmethod
+    def from_bioreactor(cls, bioreactor: 'Bioreactor') -> 'DilutionController':
+        """Create a controller reading the Bioreactor's optics and driving the configured pumps"""
+        # Imported here so the simulation runs without RPi.GPIO
+        from pwm import create_pwm_output
+        pumps = [
+            Pump(
+                create_pwm_output(pin, cfg.DILUTION_PUMP_FREQUENCY, cfg.DILUTION_PUMP_BACKEND, bioreactor.board_mode),
+                flow_rate,
+                cfg.DILUTION_PUMP_DUTY
+            )
+            for pin, flow_rate in zip(cfg.DILUTION_PUMP_PINS, cfg.DILUTION_PUMP_FLOW_RATES)
+        ]
+        for i, pump in enumerate(pumps):
+            if cfg.DILUTION_DOSE / pump.flow_rate >= cfg.DILUTION_PERIOD:
+                logging.warning(
+                    f"Dilution: pump {i + 1} needs {cfg.DILUTION_DOSE / pump.flow_rate:.1f} s per dose, "
+                    f"not less than the {cfg.DILUTION_PERIOD} s period; doses will be delayed and combined"
+                )
+
+        blank = np.full(len(pumps), np.nan)
+        if cfg.DILUTION_OD_BLANK is not None:
+            blank[:] = cfg.DILUTION_OD_BLANK
+
+        def read_od() -> List[float]:
+            with bioreactor.led_context(cfg.DILUTION_SETTLE_TIME):
+                color = bioreactor.ring_light_color
+                with bioreactor.ring_light_measurement_context(cfg.DILUTION_SETTLE_TIME):
+                    opt_dens = bioreactor.get_opt_dens()
+                # The ring light scheduler only reapplies its colour every 10 s,
+                # so put the light back straight away after each fast reading
+                if not bioreactor.ring_light_override and bioreactor.ring_light_color != color:
+                    bioreactor.change_ring_light(color)
+            voltage = np.array([opt_dens[i] for i in cfg.DILUTION_OD_CHANNELS], dtype=float)
+            # Vials without a configured blank use their first valid reading
+            missing = np.isnan(blank) & (voltage > 0)
+            if missing.any():
+                blank[missing] = voltage[missing]
+                logging.info(f"Dilution: OD blank {np.round(blank, 3).tolist()} V")
+            return list(absorbance(voltage, blank))
+
+        data_path = getattr(bioreactor, 'data_path', None)
+        return cls(read_od, pumps, event_log=event_log_path(data_path) if data_path is not None else None)
+
+    def start(self) -> None:
+        """Start the optical/dilution loop thread"""
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the loop, switch all pumps off and close the event log"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.period + 10)
+            self.thread = None
+        for pump in self.pumps:
+            pump.stop()
+        if self.event_file is not None:
+            self.event_file.close()
+            self.event_file = None
+
+    def _run(self) -> None:
+        deadline = time.monotonic()
+        while not self.stopping.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logging.error(f"Dilution control error: {e}")
+            deadline += self.period
+            if deadline < time.monotonic():
+                deadline = time.monotonic()
+            self.stopping.wait(max(0.0, deadline - time.monotonic()))
+
+    def update_filter(self, od: Sequence[float]) -> np.ndarray:
+        """Fold a new reading into the per-vial EWMA estimate, ignoring NaNs"""
+        od = np.asarray(od, dtype=float)
+        fresh = np.isnan(self.od_filtered)
+        valid = ~np.isnan(od)
+        self.od_filtered = np.where(
+            valid & fresh, od,
+            np.where(valid, self.alpha * od + (1 - self.alpha) * self.od_filtered, self.od_filtered)
+        )
+        return self.od_filtered
+
+    def step(self) -> None:
+        """Take one optical reading and dose any vial that needs it"""
+        now = self.clock()
+        dt = 0.0 if self.last_step is None else now - self.last_step
+        self.last_step = now
+        od = self.update_filter(self.read_od())
+
+        if self.mode == 'turbidostat':
+            # Hysteresis: start above od_high, keep going until below od_low
+            self.diluting = np.where(od > self.od_high, True, np.where(od < self.od_low, False, self.diluting))
+            # One dose per cycle; a dose skipped while the pump was busy is
+            # added to the next dispense (at most one extra dose)
+            self.owed = np.where(self.diluting, np.minimum(self.owed + self.dose, 2 * self.dose), 0.0)
+        else:
+            self.owed += self.dilution_rate * self.culture_volume * dt / 3600
+        # Dispense everything owed in one go once the pump is free
+        for vial in np.flatnonzero(self.owed >= self.dose):
+            self.owed[vial] -= self._dispense(vial, float(self.owed[vial]), now)
+
+    def _dispense(self, vial: int, volume: float, now: float) -> float:
+        delivered = self.pumps[vial].dispense(volume)
+        if delivered > 0:
+            event = {
+                'time': now,
+                'vial': vial + 1,
+                'volume_ml': delivered,
+                'od_filt': float(self.od_filtered[vial]),
+                'mode': self.mode
+            }
+            with self.lock:
+                self.pumped[vial] += delivered
+                self.events.append(event)
+            if self.event_writer is not None:
+                self.event_writer.writerow(event)
+                self.event_file.flush()
+            logging.debug(f"Dilution: vial {vial + 1} dosed {delivered:.3f} ml at OD {event['od_filt']:.3f}")
+        return delivered
+
+    def read(self) -> Dict[str, float]:
+        """Get filtered OD, cumulative volume and dilution rate (1/h) since the previous call"""
+        now = self.clock()
+        with self.lock:
+            pumped = self.pumped.copy()
+            added = pumped - self.pumped_at_read
+            self.pumped_at_read = pumped
+        hours = (now - self.last_read) / 3600 if self.last_read is not None else 0.0
+        self.last_read = now
+        rates = added / self.culture_volume / hours if hours > 0 else np.full(self.vials, np.nan)
+        values = np.concatenate([self.od_filtered, pumped, rates])
+        return {name: float(value) for name, value in zip(self.fieldnames, values)}
+
+
+class SimulatedCulture():
+    """Logistic growth model of several vials, for running the controller without hardware"""
+
+    def __init__(
+        self,
+        vials: int = 4,
+        od0: float = 0.05,
+        growth_rate: float = 0.5,
+        capacity: float = 2.0,
+        volume: float = 20.0,
+        noise: float = 0.0,
+        seed: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            vials: number of vials
+            od0: initial OD
+            growth_rate: specific growth rate in 1/h
+            capacity: carrying capacity (maximum OD)
+            volume: culture volume in ml (kept constant by overflow)
+            noise: standard deviation of the measurement noise
+            seed: random seed for the measurement noise
+        """
+        self.od = np.full(vials, od0, dtype=float)
+        self.growth_rate = growth_rate
+        self.capacity = capacity
+        self.volume = volume
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.time: float = 0.0
+
+    def advance(self, dt: float) -> None:
+        """Grow all vials for `dt` seconds (exact logistic solution)"""
+        growth = np.exp(self.growth_rate * dt / 3600)
+        self.od = self.capacity * self.od * growth / (self.capacity + self.od * (growth - 1))
+        self.time += dt
+
+    def dilute(self, vial: int, volume: float) -> None:
+        """Add `volume` ml of fresh media to a vial; the overflow keeps the volume constant"""
+        self.od[vial] *= self.volume / (self.volume + volume)
+
+    def read_od(self) -> List[float]:
+        """Get one noisy OD reading per vial"""
+        return list(self.od + self.rng.normal(0.0, self.noise, len(self.od)) if self.noise else self.od)
+
+    def clock(self) -> float:
+        """Simulation time in seconds"""
+        return self.time
+
+
+class SimulatedPump(Pump):
+    """Pump that dilutes a `SimulatedCulture` instantly instead of driving an output"""
+
+    def __init__(self, culture: SimulatedCulture, vial: int) -> None:
+        self.culture = culture
+        self.vial = vial
+        self.timer = None
+
+    def dispense(self, volume: float) -> float:
+        if volume <= 0:
+            return 0.0
+        self.culture.dilute(self.vial, volume)
+        return volume
+
+    def stop(self) -> None:
+        pass
+
+
+def simulate(
+    hours: float,
+    culture: Optional[SimulatedCulture] = None,
+    **controller_args
+) -> Dict[str, np.ndarray]:
+    """Run the dilution controller against a simulated culture
+
+    Args:
+        hours: simulated run length
+        culture: culture model (default: 4 vials with default parameters)
+        **controller_args: passed on to `DilutionController`
+
+    Returns:
+        dict with 'time' (s), true 'od' and 'od_filt' (steps x vials) and
+        cumulative 'pumped' volume (steps x vials)
+    """
+    culture = culture if culture is not None else SimulatedCulture()
+    vials = len(culture.od)
+    controller_args.setdefault('culture_volume', culture.volume)
+    controller = DilutionController(
+        culture.read_od,
+        [SimulatedPump(culture, i) for i in range(vials)],
+        clock=culture.clock,
+        **controller_args
+    )
+    steps = int(math.ceil(hours * 3600 / controller.period))
+    history = {
+        'time': np.empty(steps),
+        'od': np.empty((steps, vials)),
+        'od_filt': np.empty((steps, vials)),
+        'pumped': np.empty((steps, vials))
+    }
+    for i in range(steps):
+        culture.advance(controller.period)
+        controller.step()
+        history['time'][i] = culture.time
+        history['od'][i] = culture.od
+        history['od_filt'][i] = controller.od_filtered
+        history['pumped'][i] = controller.pumped
+    return history
+
+
+if __name__ == '__main__':
+    # Check that the turbidostat holds the configured band in simulation
+    od_low, od_high = np.asarray(cfg.DILUTION_OD_LOW), np.asarray(cfg.DILUTION_OD_HIGH)
+    result = simulate(24, SimulatedCulture(vials=len(od_low), noise=0.005, seed=0), mode='turbidostat')
+    od = result['od'][result['time'] >= 12 * 3600]
+    held = np.all((od >= 0.9 * od_low) & (od <= 1.05 * od_high), axis=0)
+    for vial, ok in enumerate(held):
+        print(f"vial {vial + 1}: OD {od[:, vial].min():.3f}-{od[:, vial].max():.3f} "
+              f"(band {od_low[vial]}-{od_high[vial]}) {'ok' if ok else 'FAILED'}")
+    if not held.all():
+        raise SystemExit(1)
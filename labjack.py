@@ -0,0 +1,165 @@
+"""LabJack U3 reference thermometry in hardware stream mode"""
+import logging
+import threading
+import time
+from typing import List, Dict, Optional
+import numpy as np
+import u3
+from config import BioreactorConfig as cfg
+
+
+class LabJackU3Stream():
+    """Class to stream thermometer voltages from a LabJack U3
+
+    A background thread drains the U3's stream buffer into a NumPy ring
+    buffer. `read()` converts everything received since its previous call
+    to °C and returns the per-channel mean, so each row of the main record
+    holds the average over one measurement interval.
+    """
+
+    MAX_FAILURES: int = 10  # consecutive stream errors before the reader gives up
+
+    def __init__(
+        self,
+        channels: Optional[List[int]] = None,
+        gains: Optional[List[float]] = None,
+        scan_frequency: Optional[float] = None,
+        buffer_seconds: Optional[float] = None
+    ) -> None:
+        self.channels: List[int] = list(channels if channels is not None else cfg.LABJACK_CHANNELS)
+        self.gains: np.ndarray = np.asarray(gains if gains is not None else cfg.LABJACK_GAINS, dtype=float)
+        if len(self.gains) != len(self.channels):
+            raise ValueError("LabJack gains must match the number of channels")
+        self.scan_frequency = scan_frequency if scan_frequency is not None else cfg.LABJACK_SCAN_FREQUENCY
+        buffer_seconds = buffer_seconds if buffer_seconds is not None else cfg.LABJACK_BUFFER_SECONDS
+        self.fieldnames: List[str] = [f'ref_temp{i+1}' for i in range(len(self.channels))]
+
+        # Ring buffer of raw voltages: one row per scan
+        self.capacity = int(self.scan_frequency * buffer_seconds)
+        self.buffer: np.ndarray = np.full((self.capacity, len(self.channels)), np.nan)
+        self.total: int = 0  # scans written since start
+        self.last_read: int = 0  # value of `total` at the previous read()
+        self.missed: int = 0
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+
+        self.device = u3.U3()
+        self.device.getCalibrationData()
+        # Configure the requested FIO lines as analog inputs
+        self.device.configIO(FIOAnalog=sum(1 << ch for ch in self.channels if ch < 8))
+        self.device.streamConfig(
+            NumChannels=len(self.channels),
+            PChannels=self.channels,
+            NChannels=[31] * len(self.channels),  # single-ended
+            Resolution=3,
+            ScanFrequency=self.scan_frequency
+        )
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start streaming and the background reader thread"""
+        self.device.streamStart()
+        self.running.set()
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the reader thread and the U3 stream"""
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        try:
+            self.device.streamStop()
+        except Exception as e:
+            logging.error(f"Error stopping LabJack stream: {e}")
+        try:
+            self.device.close()
+        except Exception as e:
+            logging.error(f"Error closing LabJack: {e}")
+
+    def _reader(self) -> None:
+        """Drain stream packets into the ring buffer until stopped"""
+        keys = [f'AIN{ch}' for ch in self.channels]
+        # Samples of scans split across packets, per channel: LabJackPython
+        # carries its channel offset over, so a packet need not end on a scan
+        pending: List[List[float]] = [[] for _ in keys]
+        failures = 0
+        while self.running.is_set():
+            try:
+                for packet in self.device.streamData():
+                    if not self.running.is_set():
+                        return
+                    if packet is None:
+                        continue
+                    if packet['errors'] or packet['missed']:
+                        self.missed += packet['missed']
+                        logging.warning(
+                            f"LabJack stream: {packet['errors']} errors, {packet['missed']} missed scans"
+                        )
+                    try:
+                        samples = [packet[key] for key in keys]
+                    except KeyError as e:
+                        logging.warning(f"LabJack stream: skipped packet without channel {e}")
+                        continue
+                    for column, values in zip(pending, samples):
+                        column.extend(values)
+                    scans = min(len(column) for column in pending)
+                    if scans:
+                        self._write(np.column_stack([column[:scans] for column in pending]))
+                        for column in pending:
+                            del column[:scans]
+                    failures = 0
+            except Exception as e:
+                failures += 1
+                if failures >= self.MAX_FAILURES:
+                    logging.error(f"LabJack stream reader stopped after {failures} failures: {e}")
+                    self.running.clear()
+                    return
+                logging.error(f"LabJack stream error, resuming: {e}")
+                for column in pending:
+                    column.clear()
+                time.sleep(1)
+
+    def _write(self, block: np.ndarray) -> None:
+        """Append a (scans, channels) block of voltages to the ring buffer"""
+        n = len(block)
+        if n > self.capacity:
+            block = block[-self.capacity:]
+        with self.lock:
+            start = (self.total + n - len(block)) % self.capacity
+            first = min(len(block), self.capacity - start)
+            self.buffer[start:start + first] = block[:first]
+            self.buffer[:len(block) - first] = block[first:]
+            self.total += n
+
+    def _window(self, scans: int) -> np.ndarray:
+        """Copy the most recent `scans` rows out of the ring buffer (lock held)"""
+        scans = min(scans, self.capacity, self.total)
+        end = self.total % self.capacity
+        idx = np.arange(end - scans, end) % self.capacity
+        return self.buffer[idx]
+
+    def to_celsius(self, volts: np.ndarray) -> np.ndarray:
+        """Convert thermometer voltages to °C (10 mV/°F output after gain)"""
+        return ((volts / self.gains) * 100 - 32) * (5 / 9)
+
+    def get_temperatures(self, seconds: float = 1.0) -> List[float]:
+        """Get the mean temperature in °C over the most recent `seconds`"""
+        with self.lock:
+            volts = self._window(int(seconds * self.scan_frequency))
+        return self._mean(volts)
+
+    def read(self) -> Dict[str, float]:
+        """Get the mean temperatures since the previous call, keyed by fieldname"""
+        with self.lock:
+            volts = self._window(self.total - self.last_read)
+            self.last_read = self.total
+        if not self.running.is_set():
+            logging.error("LabJack stream is not running")
+        return dict(zip(self.fieldnames, self._mean(volts)))
+
+    def _mean(self, volts: np.ndarray) -> List[float]:
+        if len(volts) == 0:
+            return [float('nan')] * len(self.channels)
+        return [float(t) for t in np.nanmean(self.to_celsius(volts), axis=0)]
@@ -0,0 +1,121 @@
+"""Load recorded runs from `data/` into NumPy arrays
+
+Handles both file layouts in the repository: the current CSV written by
+`utils.create_csv_writer` (`elapsed`, `opt_dens1`, ...) and the older `.txt`
+logs (`time`, `t(s)`, `T1_{ext}`, `Turb1_{180}`, ...). Old column names are
+mapped onto the current ones where the sensor is the same.
+"""
+import io
+import logging
+import os
+import re
+import warnings
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+import numpy as np
+
+# Columns holding time rather than a sensor channel, in order of preference
+TIME_COLUMNS: List[str] = ['elapsed', 't(s)', 'time']
+
+# Old .txt column names (braces stripped) mapped onto current CSV names
+CHANNEL_ALIASES: List[tuple[str, str]] = [
+    (r'^T_env$', 'atm_temp'),
+    (r'^P_env$', 'atm_press'),
+    (r'^T(\d)_ext$', r'ext_temp\1'),
+    (r'^T(\d)$', r'int_temp\1'),
+    (r'^P(\d)$', r'int_press\1'),
+    (r'^H(\d)$', r'int_humid\1'),
+    (r'^Turb(\d)_ref$', r'led_ref\1'),
+]
+
+
+class Run(NamedTuple):
+    """A recorded run: `data[i, j]` is channel `channels[j]` at `time[i]` seconds"""
+    path: str
+    time: np.ndarray
+    channels: List[str]
+    data: np.ndarray
+    start_time: Optional[float]  # Unix time of the first row, if recorded
+
+
+def normalize_channel(name: str) -> str:
+    """Map an old column name onto the current naming scheme"""
+    name = name.strip().replace('{', '').replace('}', '')
+    for pattern, replacement in CHANNEL_ALIASES:
+        if re.match(pattern, name):
+            return re.sub(pattern, replacement, name)
+    return name
+
+
+def is_run_file(name: str) -> bool:
+    """Check whether a file name in a data directory is a recorded run
+
+    Dot-files and dot-directories (pyramid and dilution sidecars) are skipped.
+    """
+    return name.endswith(('.csv', '.txt')) and not name.startswith('.')
+
+
+def _read_table(path: str) -> tuple[List[str], np.ndarray]:
+    with open(path) as f:
+        text = f.read()
+    # Some early logs wrapped long rows onto indented continuation lines
+    text = re.sub(r',\s*\n[ \t]+', ',', text)
+    header, _, body = text.partition('\n')
+    columns = [c.strip() for c in header.split(',')] if header.strip() else []
+    if not body.strip():
+        return columns, np.empty((0, len(columns)))
+    try:
+        values = np.loadtxt(io.StringIO(body), delimiter=',', ndmin=2)
+    except ValueError:
+        # Truncated or malformed rows (e.g. a run killed mid-write) are dropped
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            values = np.genfromtxt(io.StringIO(body), delimiter=',', invalid_raise=False, ndmin=2)
+        for warning in caught:
+            logging.warning(f"{path}: {str(warning.message).strip()}")
+    return columns, values
+
+
+@lru_cache(maxsize=64)
+def _load_cached(path: str, mtime: float, size: int) -> Run:
+    columns, values = _read_table(path)
+    if len(values) and values.shape[1] != len(columns):
+        raise ValueError(f"{path}: {values.shape[1]} values per row but {len(columns)} columns")
+    start_time: Optional[float] = None
+    if 'time' in columns and len(values):
+        start_time = float(values[0, columns.index('time')])
+    for name in TIME_COLUMNS:
+        if name in columns:
+            t = values[:, columns.index(name)].copy()
+            break
+    else:
+        raise ValueError(f"{path}: no time column (expected one of {TIME_COLUMNS})")
+    if name == 'time' and len(t):
+        t -= t[0]
+    keep = [i for i, c in enumerate(columns) if c not in TIME_COLUMNS]
+    data = np.ascontiguousarray(values[:, keep])
+    # Shared between callers through the cache, so make them read-only
+    t.flags.writeable = False
+    data.flags.writeable = False
+    return Run(path, t, [normalize_channel(columns[i]) for i in keep], data, start_time)
+
+
+def load_run(path: str) -> Run:
+    """Load a run, reusing the parsed arrays while the file is unchanged
+
+    Args:
+        path: path to a `.csv` or `.txt` data file
+
+    Returns:
+        Run: time in seconds since the first row, channel names and a
+            (rows, channels) array; the arrays are read-only
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _load_cached(path, stat.st_mtime, stat.st_size)
+
+
+def channel_index(run: Run, channels: List[str]) -> List[int]:
+    """Get the column indices of `channels` in a run (-1 where missing)"""
+    lookup = {name: i for i, name in enumerate(run.channels)}
+    return [lookup.get(normalize_channel(name), -1) for name in channels]
@@ -0,0 +1,167 @@
+"""PWM output backends for stirrers, heaters and pumps
+
+Pins are given in physical BOARD numbering (as in `config.py`) and mapped to
+BCM through `BCM_MAP` where the backend needs it. pigpio always uses BCM
+numbering; RPi.GPIO uses whichever mode the Bioreactor has set.
+"""
+import logging
+from typing import Optional
+import RPi.GPIO as IO
+from config import BioreactorConfig as cfg
+
+# BCM pins wired to the SoC's two hardware PWM channels
+HARDWARE_PWM_PINS: set[int] = {12, 13, 18, 19}
+
+
+def to_bcm(pin: int) -> int:
+    """Map a BOARD pin number to its BCM number"""
+    try:
+        return cfg.BCM_MAP[pin]
+    except KeyError:
+        raise ValueError(f"Board pin {pin} has no BCM mapping") from None
+
+
+class PWMOutput():
+    """Base class for a single PWM output with a duty cycle in percent"""
+
+    def __init__(self, pin: int, frequency: int) -> None:
+        self.pin = pin
+        self.frequency = frequency
+        self.duty: float = 0.0
+
+    def set_duty(self, duty: float) -> None:
+        """Set the duty cycle (0-100 %) without restarting the output"""
+        duty = min(max(float(duty), 0.0), 100.0)
+        self._apply(duty)
+        self.duty = duty
+
+    def _apply(self, duty: float) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Drive the output low and release it"""
+        self.set_duty(0)
+
+
+class PigpioOutput(PWMOutput):
+    """Base class for outputs driven through pigpiod (BCM numbering)"""
+
+    def __init__(self, pin: int, frequency: int, pi: Optional['pigpio.pi'] = None) -> None:
+        import pigpio
+        super().__init__(to_bcm(pin), frequency)
+        # Only close the pigpiod connection on stop() if this output opened it
+        self.owns_pi = pi is None
+        self.stopped = False
+        self.pi = pi if pi is not None else pigpio.pi()
+        if not self.pi.connected:
+            raise OSError("Could not connect to pigpiod")
+
+    def stop(self) -> None:
+        """Drive the output low and release it; further calls do nothing"""
+        if self.stopped or not self.pi.connected:
+            return
+        super().stop()
+        self.pi.write(self.pin, 0)
+        self.stopped = True
+        if self.owns_pi:
+            self.pi.stop()
+
+
+class HardwarePWMOutput(PigpioOutput):
+    """Hardware PWM through pigpio (BCM 12, 13, 18 or 19 only)"""
+
+    def __init__(self, pin: int, frequency: int, pi: Optional['pigpio.pi'] = None) -> None:
+        if to_bcm(pin) not in HARDWARE_PWM_PINS:
+            raise ValueError(f"BCM pin {to_bcm(pin)} has no hardware PWM channel")
+        super().__init__(pin, frequency, pi)
+        self._apply(0.0)
+
+    def _apply(self, duty: float) -> None:
+        # hardware_PWM takes duty in millionths
+        self.pi.hardware_PWM(self.pin, self.frequency, int(duty * 10000))
+
+
+class DMAPWMOutput(PigpioOutput):
+    """DMA-timed PWM through pigpio, available on any GPIO pin"""
+
+    RANGE: int = 1000
+
+    def __init__(self, pin: int, frequency: int, pi: Optional['pigpio.pi'] = None) -> None:
+        import pigpio
+        super().__init__(pin, frequency, pi)
+        self.pi.set_mode(self.pin, pigpio.OUTPUT)
+        self.pi.set_PWM_frequency(self.pin, frequency)
+        self.pi.set_PWM_range(self.pin, self.RANGE)
+        self._apply(0.0)
+
+    def _apply(self, duty: float) -> None:
+        self.pi.set_PWM_dutycycle(self.pin, int(round(duty * self.RANGE / 100)))
+
+
+class SoftwarePWMOutput(PWMOutput):
+    """Software PWM through RPi.GPIO (fallback when pigpiod is unavailable)"""
+
+    def __init__(self, pin: int, frequency: int, board_mode: str = 'BCM') -> None:
+        super().__init__(to_bcm(pin) if board_mode.upper() == 'BCM' else pin, frequency)
+        IO.setup(self.pin, IO.OUT)
+        self.pwm = IO.PWM(self.pin, frequency)
+        self.pwm.start(0)
+
+    def _apply(self, duty: float) -> None:
+        self.pwm.ChangeDutyCycle(duty)
+
+    def stop(self) -> None:
+        self.pwm.stop()
+        self.duty = 0.0
+
+
+class DigitalOutput(PWMOutput):
+    """Plain on/off GPIO output: any non-zero duty drives the pin high"""
+
+    def __init__(self, pin: int, board_mode: str = 'BCM') -> None:
+        super().__init__(to_bcm(pin) if board_mode.upper() == 'BCM' else pin, 0)
+        IO.setup(self.pin, IO.OUT)
+        IO.output(self.pin, 0)
+
+    def _apply(self, duty: float) -> None:
+        IO.output(self.pin, 1 if duty > 0 else 0)
+
+
+def create_pwm_output(
+    pin: int,
+    frequency: int,
+    backend: str = 'auto',
+    board_mode: str = 'BCM'
+) -> PWMOutput:
+    """Create a PWM output on a BOARD pin using the requested backend.
+
+    Args:
+        pin: physical BOARD pin number
+        frequency: PWM frequency in Hz
+        backend: 'hardware', 'dma', 'software', 'gpio' (on/off only) or 'auto'
+        board_mode: RPi.GPIO numbering mode, used by the software backend
+
+    Returns:
+        PWMOutput: the created output, at 0 % duty
+
+    With 'auto', hardware PWM is used when the pin supports it, DMA-timed PWM
+    otherwise, and software PWM only if pigpiod cannot be reached.
+    """
+    backend = backend.lower()
+    if backend == 'hardware':
+        return HardwarePWMOutput(pin, frequency)
+    if backend == 'dma':
+        return DMAPWMOutput(pin, frequency)
+    if backend == 'software':
+        return SoftwarePWMOutput(pin, frequency, board_mode)
+    if backend == 'gpio':
+        return DigitalOutput(pin, board_mode)
+    if backend != 'auto':
+        raise ValueError("Invalid PWM backend: use 'hardware', 'dma', 'software', 'gpio' or 'auto'")
+    try:
+        if to_bcm(pin) in HARDWARE_PWM_PINS:
+            return HardwarePWMOutput(pin, frequency)
+        return DMAPWMOutput(pin, frequency)
+    except (ImportError, OSError) as e:
+        logging.warning(f"pigpio unavailable ({e}), falling back to software PWM on pin {pin}")
+        return SoftwarePWMOutput(pin, frequency, board_mode)
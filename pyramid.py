@@ -0,0 +1,272 @@
+"""Multi-resolution min/max/mean/count index for fast queries over long runs
+
+Each level holds one row of aggregates per time bin (1 min, 10 min and 1 h
+by default) for every channel. Levels are updated incrementally as rows are
+written, can be backfilled from existing `data/` files, and are stored as a
+`.npz` sidecar in `data/.pyramid/`. `query()` picks the finest level that
+fits a point budget using binary search, so its cost does not grow with the
+length of the run.
+
+Backfill existing runs with:
+    python pyramid.py data/*.csv
+"""
+import logging
+import os
+import sys
+import threading
+from typing import List, Dict, Optional, Sequence
+import numpy as np
+from config import BioreactorConfig as cfg
+from loader import load_run, is_run_file
+
+
+class PyramidLevel():
+    """Aggregates of every channel over fixed-width time bins"""
+
+    def __init__(self, resolution: float, n_channels: int, capacity: int = 256) -> None:
+        self.resolution = resolution
+        self.size = 0
+        self.bins = np.empty(capacity, dtype=np.int64)  # bin index = floor(t / resolution)
+        self.count = np.empty((capacity, n_channels), dtype=np.int64)
+        self.min = np.empty((capacity, n_channels))
+        self.max = np.empty((capacity, n_channels))
+        self.sum = np.empty((capacity, n_channels))
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self.bins):
+            return
+        capacity = max(needed, 2 * len(self.bins))
+        for name in ('bins', 'count', 'min', 'max', 'sum'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, t: float, values: np.ndarray) -> None:
+        """Fold a single row into its bin"""
+        b = int(np.floor(t / self.resolution))
+        valid = ~np.isnan(values)
+        if self.size and self.bins[self.size - 1] == b:
+            i = self.size - 1
+            self.count[i] += valid
+            self.min[i] = np.fmin(self.min[i], values)
+            self.max[i] = np.fmax(self.max[i], values)
+            self.sum[i] += np.where(valid, values, 0.0)
+            return
+        if self.size and b < self.bins[self.size - 1]:
+            logging.warning(f"Pyramid: row at t={t} is older than the current bin, skipped")
+            return
+        self._reserve(1)
+        i = self.size
+        self.bins[i] = b
+        self.count[i] = valid
+        self.min[i] = values
+        self.max[i] = values
+        self.sum[i] = np.where(valid, values, 0.0)
+        self.size += 1
+
+    def extend(self, t: np.ndarray, values: np.ndarray) -> None:
+        """Fold many time-ordered rows into their bins (vectorized)"""
+        if not len(t):
+            return
+        b = np.floor(t / self.resolution).astype(np.int64)
+        if self.size:
+            keep = b >= self.bins[self.size - 1]
+            if not keep.all():
+                logging.warning(f"Pyramid: {np.count_nonzero(~keep)} rows older than the current bin skipped")
+                t, b, values = t[keep], b[keep], values[keep]
+                if not len(b):
+                    return
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        valid = ~np.isnan(values)
+        count = np.add.reduceat(valid, starts, axis=0)
+        lo = np.fmin.reduceat(values, starts, axis=0)
+        hi = np.fmax.reduceat(values, starts, axis=0)
+        total = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        new_bins = b[starts]
+        if self.size and new_bins[0] == self.bins[self.size - 1]:
+            # First group continues the currently open bin
+            i = self.size - 1
+            self.count[i] += count[0]
+            self.min[i] = np.fmin(self.min[i], lo[0])
+            self.max[i] = np.fmax(self.max[i], hi[0])
+            self.sum[i] += total[0]
+            new_bins, count, lo, hi, total = new_bins[1:], count[1:], lo[1:], hi[1:], total[1:]
+        n = len(new_bins)
+        self._reserve(n)
+        s = slice(self.size, self.size + n)
+        self.bins[s], self.count[s], self.min[s], self.max[s], self.sum[s] = new_bins, count, lo, hi, total
+        self.size += n
+
+
+class DownsamplePyramid():
+    """Class to maintain and query multi-resolution aggregates of a run"""
+
+    def __init__(self, channels: Sequence[str], resolutions: Optional[Sequence[float]] = None) -> None:
+        self.channels: List[str] = list(channels)
+        self.lookup: Dict[str, int] = {name: i for i, name in enumerate(self.channels)}
+        resolutions = resolutions if resolutions is not None else cfg.PYRAMID_RESOLUTIONS
+        self.levels: List[PyramidLevel] = [
+            PyramidLevel(r, len(self.channels)) for r in sorted(resolutions)
+        ]
+        self.rows: int = 0  # rows folded in so far, used to resume backfills
+        self.source: tuple = (0, 0.0)  # (size, mtime) of the data file when saved
+        # Rows are appended by the acquisition loop while the dashboard queries
+        self.lock = threading.Lock()
+
+    def append(self, row: Dict[str, float], time_key: str = 'elapsed') -> None:
+        """Fold one data row (as written by `measure_and_write_sensor_data`) into every level"""
+        values = np.array([row.get(name, np.nan) for name in self.channels], dtype=float)
+        t = float(row[time_key])
+        with self.lock:
+            for level in self.levels:
+                level.add(t, values)
+            self.rows += 1
+
+    def extend(self, t: np.ndarray, data: np.ndarray) -> None:
+        """Fold a block of rows, with columns in `self.channels` order, into every level"""
+        t = np.asarray(t, dtype=float)
+        data = np.asarray(data, dtype=float)
+        with self.lock:
+            for level in self.levels:
+                level.extend(t, data)
+            self.rows += len(t)
+
+    def query(
+        self,
+        channel: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        points: int = 1000
+    ) -> Dict[str, np.ndarray]:
+        """Get a channel over a time window at no more than `points` points
+
+        Args:
+            channel: channel name
+            start, end: window in seconds since the start of the run (None = open)
+            points: maximum number of points to return
+
+        Returns:
+            dict of 'time' (bin centres), 'min', 'max', 'mean' and 'count'
+        """
+        c = self.lookup[channel]
+        points = max(1, int(points))
+        with self.lock:
+            for level in self.levels:
+                lo, hi = self._window(level, start, end)
+                if hi - lo <= points:
+                    break
+            sl = slice(lo, hi)
+            count = level.count[sl, c].copy()
+            lo_v, hi_v, total = level.min[sl, c].copy(), level.max[sl, c].copy(), level.sum[sl, c].copy()
+            time = level.bins[sl] * level.resolution
+        group = int(np.ceil((hi - lo) / points)) if hi > lo else 1
+        width = level.resolution
+        if group > 1:
+            # Even the coarsest level is over budget: merge neighbouring bins
+            starts = np.arange(0, hi - lo, group)
+            count = np.add.reduceat(count, starts)
+            lo_v = np.fmin.reduceat(lo_v, starts)
+            hi_v = np.fmax.reduceat(hi_v, starts)
+            total = np.add.reduceat(total, starts)
+            time = time[starts]
+            width = level.resolution * group
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+        return {
+            'time': time + width / 2,
+            'min': lo_v,
+            'max': hi_v,
+            'mean': mean,
+            'count': count
+        }
+
+    def _window(self, level: PyramidLevel, start: Optional[float], end: Optional[float]) -> tuple[int, int]:
+        bins = level.bins[:level.size]
+        lo = 0 if start is None else int(np.searchsorted(bins, np.floor(start / level.resolution), 'left'))
+        hi = level.size if end is None else int(np.searchsorted(bins, np.floor(end / level.resolution), 'right'))
+        return lo, hi
+
+    def save(self, path: str, source_size: int = 0, source_mtime: float = 0.0) -> None:
+        """Write the pyramid to a `.npz` file (atomically)"""
+        with self.lock:
+            arrays: Dict[str, np.ndarray] = {
+                'channels': np.array(self.channels),
+                'resolutions': np.array([level.resolution for level in self.levels]),
+                'rows': np.array(self.rows),
+                'source': np.array([source_size, source_mtime]),
+            }
+            for i, level in enumerate(self.levels):
+                for name in ('bins', 'count', 'min', 'max', 'sum'):
+                    arrays[f'{name}{i}'] = getattr(level, name)[:level.size].copy()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'DownsamplePyramid':
+        """Read a pyramid written by `save()`"""
+        with np.load(path) as f:
+            pyramid = cls([str(c) for c in f['channels']], [float(r) for r in f['resolutions']])
+            pyramid.rows = int(f['rows'])
+            pyramid.source = tuple(f['source'])
+            for i, level in enumerate(pyramid.levels):
+                level.bins = f[f'bins{i}']
+                level.count = f[f'count{i}']
+                level.min = f[f'min{i}']
+                level.max = f[f'max{i}']
+                level.sum = f[f'sum{i}']
+                level.size = len(level.bins)
+        return pyramid
+
+
+def index_path(data_path: str) -> str:
+    """Get the sidecar path of a data file's pyramid"""
+    directory, name = os.path.split(os.path.abspath(data_path))
+    return os.path.join(directory, cfg.PYRAMID_DIR, os.path.splitext(name)[0] + '.npz')
+
+
+def open_pyramid(data_path: str, save: bool = True) -> DownsamplePyramid:
+    """Open the pyramid of a data file, building or extending it as needed
+
+    An existing sidecar is reused as-is while the data file is unchanged.
+    If rows have been appended since, only the new rows are folded in; if
+    the file was rewritten the pyramid is rebuilt from scratch.
+    """
+    stat = os.stat(data_path)
+    sidecar = index_path(data_path)
+    run = None
+    pyramid: Optional[DownsamplePyramid] = None
+    if os.path.exists(sidecar):
+        try:
+            pyramid = DownsamplePyramid.load(sidecar)
+            if pyramid.source == (stat.st_size, stat.st_mtime):
+                return pyramid
+            run = load_run(data_path)
+            if pyramid.channels != run.channels or stat.st_size < pyramid.source[0] or pyramid.rows > len(run.time):
+                pyramid = None
+        except Exception as e:
+            logging.warning(f"Rebuilding unreadable pyramid {sidecar}: {e}")
+            pyramid = None
+    if run is None:
+        run = load_run(data_path)
+    if pyramid is None:
+        pyramid = DownsamplePyramid(run.channels)
+    pyramid.extend(run.time[pyramid.rows:], run.data[pyramid.rows:])
+    if save:
+        pyramid.save(sidecar, stat.st_size, stat.st_mtime)
+    return pyramid
+
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or sorted(
+        os.path.join('data', f) for f in os.listdir('data') if is_run_file(f)
+    )
+    for path in paths:
+        try:
+            pyramid = open_pyramid(path)
+            print(f"{path}: {pyramid.rows} rows, {[level.size for level in pyramid.levels]} bins")
+        except Exception as e:
+            print(f"{path}: {e}")
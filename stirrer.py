@@ -0,0 +1,116 @@
+"""Stirrer driver with speed ramps and profiles on top of a PWM backend"""
+import logging
+import threading
+import time
+from typing import List, Tuple, Optional
+from config import BioreactorConfig as cfg
+from pwm import PWMOutput, create_pwm_output
+
+
+class Stirrer():
+    """Class to drive the stirrer fans with ramped speed changes
+
+    Speed is the PWM duty cycle in percent. Ramps and profiles run in a
+    background thread and only ever change the duty cycle, so the PWM
+    output is never restarted.
+    """
+
+    def __init__(self, output: PWMOutput) -> None:
+        self.output = output
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, board_mode: str = 'BCM') -> 'Stirrer':
+        """Create a stirrer from the settings in `config.py`"""
+        output = create_pwm_output(
+            cfg.STIRRER_PIN,
+            cfg.STIRRER_SPEED,
+            backend=cfg.STIRRER_BACKEND,
+            board_mode=board_mode
+        )
+        return cls(output)
+
+    @property
+    def speed(self) -> float:
+        """Current duty cycle in percent"""
+        return self.output.duty
+
+    def set_speed(self, duty: float) -> None:
+        """Set the speed immediately, cancelling any running ramp or profile"""
+        self.cancel()
+        with self._lock:
+            self.output.set_duty(duty)
+
+    def ramp_to(self, duty: float, duration: float, wait: bool = False) -> None:
+        """Ramp linearly from the current speed to `duty` over `duration` seconds
+
+        Args:
+            duty: target duty cycle (0-100 %)
+            duration: ramp time in seconds
+            wait: block until the ramp has finished
+        """
+        self._start([(duty, duration, 0.0)], repeat=False, wait=wait)
+
+    def run_profile(
+        self,
+        profile: List[Tuple[float, float, float]],
+        repeat: bool = False,
+        wait: bool = False
+    ) -> None:
+        """Run a speed profile in the background
+
+        Args:
+            profile: list of (duty, ramp_s, hold_s) steps; each step ramps to
+                `duty` over `ramp_s` seconds and then holds it for `hold_s`
+            repeat: loop the profile until cancelled
+            wait: block until the profile has finished (ignored if repeat)
+        """
+        self._start(profile, repeat=repeat, wait=wait and not repeat)
+
+    def cancel(self) -> None:
+        """Stop any running ramp or profile, keeping the current speed"""
+        if self._worker is not None and self._worker.is_alive():
+            self._cancel.set()
+            if self._worker is not threading.current_thread():
+                self._worker.join()
+        self._worker = None
+
+    def stop(self) -> None:
+        """Cancel ramps and stop the PWM output"""
+        self.cancel()
+        with self._lock:
+            self.output.stop()
+
+    def _start(self, profile: List[Tuple[float, float, float]], repeat: bool, wait: bool) -> None:
+        self.cancel()
+        self._cancel.clear()
+        self._worker = threading.Thread(target=self._run_profile, args=(profile, repeat), daemon=True)
+        self._worker.start()
+        if wait:
+            self._worker.join()
+
+    def _run_profile(self, profile: List[Tuple[float, float, float]], repeat: bool) -> None:
+        try:
+            while True:
+                for duty, ramp_s, hold_s in profile:
+                    if not self._ramp(duty, ramp_s) or self._cancel.wait(hold_s):
+                        return
+                if not repeat:
+                    return
+        except Exception as e:
+            logging.error(f"Stirrer profile aborted: {e}")
+
+    def _ramp(self, duty: float, duration: float) -> bool:
+        """Step the duty cycle towards `duty`; returns False if cancelled"""
+        start_duty = self.output.duty
+        steps = max(1, int(duration / cfg.STIRRER_RAMP_INTERVAL))
+        start = time.monotonic()
+        for i in range(1, steps + 1):
+            # Sleep to an absolute deadline so the ramp does not drift under load
+            if self._cancel.wait(max(0.0, start + i * duration / steps - time.monotonic())):
+                return False
+            with self._lock:
+                self.output.set_duty(start_duty + (duty - start_duty) * i / steps)
+        return True
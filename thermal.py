@@ -0,0 +1,240 @@
+"""Closed-loop Peltier temperature control running in its own thread"""
+import logging
+import math
+import threading
+import time
+from typing import List, Dict, Optional
+import numpy as np
+from config import BioreactorConfig as cfg
+from pwm import PWMOutput, create_pwm_output
+
+
+class PIDController():
+    """PID controller with feed-forward, anti-windup and output rate limiting
+
+    Output is in percent, -100 (full cooling) to 100 (full heating).
+    """
+
+    def __init__(
+        self,
+        kp: float,
+        ki: float,
+        kd: float,
+        kff: float = 0.0,
+        output_min: float = -100.0,
+        output_max: float = 100.0,
+        rate_limit: Optional[float] = None
+    ) -> None:
+        """
+        Args:
+            kp, ki, kd: proportional, integral and derivative gains
+            kff: feed-forward gain on (setpoint - ambient)
+            output_min, output_max: actuator limits
+            rate_limit: maximum output change per second (None = unlimited)
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.kff = kff
+        self.output_min = output_min
+        self.output_max = output_max
+        self.rate_limit = rate_limit
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the integral, derivative and output history"""
+        self.integral: float = 0.0
+        self.prev_measurement: Optional[float] = None
+        self.output: float = 0.0
+
+    def update(
+        self,
+        setpoint: float,
+        measurement: float,
+        dt: float,
+        ambient: Optional[float] = None
+    ) -> float:
+        """Compute a new actuator output
+
+        Args:
+            setpoint: target temperature
+            measurement: measured temperature
+            dt: seconds since the previous update
+            ambient: ambient temperature for the feed-forward term
+
+        Returns:
+            float: the new, limited output
+        """
+        error = setpoint - measurement
+        # Derivative on measurement so setpoint steps do not kick the output
+        derivative = 0.0
+        if self.prev_measurement is not None and dt > 0:
+            derivative = -(measurement - self.prev_measurement) / dt
+        self.prev_measurement = measurement
+        feed_forward = 0.0
+        if ambient is not None and not math.isnan(ambient):
+            feed_forward = self.kff * (setpoint - ambient)
+
+        unclamped = feed_forward + self.kp * error + self.integral + self.ki * error * dt + self.kd * derivative
+        output = min(max(unclamped, self.output_min), self.output_max)
+        if self.rate_limit is not None and dt > 0:
+            max_step = self.rate_limit * dt
+            output = min(max(output, self.output - max_step), self.output + max_step)
+
+        # Anti-windup: only integrate while the output is neither saturated
+        # nor held by the rate limit, or when the error is pulling it back
+        if output == unclamped or (unclamped > output) != (error > 0):
+            self.integral += self.ki * error * dt
+            self.integral = min(max(self.integral, self.output_min), self.output_max)
+        self.output = output
+        return output
+
+
+class PeltierDriver():
+    """Class to drive a Peltier element through an H-bridge with two PWM inputs"""
+
+    def __init__(self, heat: PWMOutput, cool: PWMOutput) -> None:
+        self.heat = heat
+        self.cool = cool
+        self.output: float = 0.0
+
+    @classmethod
+    def from_config(cls, board_mode: str = 'BCM') -> 'PeltierDriver':
+        """Create a Peltier driver from the settings in `config.py`"""
+        return cls(
+            create_pwm_output(cfg.PELTIER_HEAT_PIN, cfg.PELTIER_FREQUENCY, cfg.PELTIER_BACKEND, board_mode),
+            create_pwm_output(cfg.PELTIER_COOL_PIN, cfg.PELTIER_FREQUENCY, cfg.PELTIER_BACKEND, board_mode)
+        )
+
+    def set_output(self, output: float) -> None:
+        """Set the drive in percent: positive heats, negative cools"""
+        output = min(max(output, -100.0), 100.0)
+        # Release one side before driving the other so the bridge never shorts
+        if output >= 0:
+            self.cool.set_duty(0)
+            self.heat.set_duty(output)
+        else:
+            self.heat.set_duty(0)
+            self.cool.set_duty(-output)
+        self.output = output
+
+    def stop(self) -> None:
+        """Switch the Peltier off"""
+        self.heat.stop()
+        self.cool.stop()
+        self.output = 0.0
+
+
+class ThermalController():
+    """Class to regulate vial temperature with a Peltier at a fixed loop rate
+
+    The loop reads the BME280 (`int`) or DS18B20 (`ext`) temperatures, plus
+    the atmospheric sensor for the feed-forward term, in a dedicated thread
+    and sleeps to absolute deadlines, so its timing does not depend on
+    plotting or CSV writes in the main loop. It is registered as an auxiliary
+    source on the Bioreactor, logging the setpoint, the measured control
+    temperature and the mean actuator output of each data row.
+    """
+
+    fieldnames: List[str] = ['temp_setpoint', 'temp_control', 'peltier_output']
+
+    def __init__(
+        self,
+        bioreactor: 'Bioreactor',
+        peltier: Optional[PeltierDriver] = None,
+        setpoint: Optional[float] = None,
+        period: Optional[float] = None
+    ) -> None:
+        self.bioreactor = bioreactor
+        self.peltier = peltier if peltier is not None else PeltierDriver.from_config(bioreactor.board_mode)
+        self.setpoint: float = setpoint if setpoint is not None else cfg.THERMAL_SETPOINT
+        self.period: float = period if period is not None else cfg.THERMAL_PERIOD
+        self.pid = PIDController(
+            cfg.THERMAL_KP, cfg.THERMAL_KI, cfg.THERMAL_KD, cfg.THERMAL_KFF,
+            rate_limit=cfg.THERMAL_RATE_LIMIT
+        )
+        self.measurement: float = float('nan')
+        self.output_sum: float = 0.0
+        self.output_count: int = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the control loop thread"""
+        self.pid.reset()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the control loop and switch the Peltier off"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.period + 5)
+            self.thread = None
+        self.peltier.stop()
+
+    def set_setpoint(self, setpoint: float) -> None:
+        """Change the target temperature"""
+        self.setpoint = setpoint
+
+    def get_control_temp(self) -> float:
+        """Get the mean of the configured control sensors"""
+        if cfg.THERMAL_SENSOR == 'int':
+            temps = self.bioreactor.get_int_temp()
+        elif cfg.THERMAL_SENSOR == 'ext':
+            temps = self.bioreactor.get_ext_temp()
+        else:
+            raise ValueError("Invalid thermal sensor: use 'int' or 'ext'")
+        selected = np.asarray(temps, dtype=float)[cfg.THERMAL_SENSOR_INDICES]
+        if np.all(np.isnan(selected)):
+            return float('nan')
+        return float(np.nanmean(selected))
+
+    def step(self, dt: float) -> float:
+        """Run one control update and return the actuator output"""
+        measurement = self.get_control_temp()
+        if math.isnan(measurement) or measurement > cfg.THERMAL_MAX_TEMP:
+            # Fail safe: no valid reading or over-temperature
+            logging.error(f"Thermal control: unsafe temperature reading {measurement}, Peltier off")
+            self.pid.reset()
+            output = 0.0
+        else:
+            output = self.pid.update(self.setpoint, measurement, dt, ambient=self.bioreactor.get_atm_temp())
+        self.peltier.set_output(output)
+        with self.lock:
+            self.measurement = measurement
+            self.output_sum += output
+            self.output_count += 1
+        return output
+
+    def _run(self) -> None:
+        deadline = time.monotonic()
+        last = deadline
+        while not self.stopping.is_set():
+            now = time.monotonic()
+            try:
+                self.step(now - last)
+            except Exception as e:
+                logging.error(f"Thermal control error: {e}")
+                self.peltier.set_output(0.0)
+            last = now
+            deadline += self.period
+            # Skip missed cycles rather than bursting to catch up
+            if deadline < time.monotonic():
+                deadline = time.monotonic()
+            self.stopping.wait(max(0.0, deadline - time.monotonic()))
+
+    def read(self) -> Dict[str, float]:
+        """Get the setpoint, latest control temperature and mean output since the previous call"""
+        with self.lock:
+            mean_output = self.output_sum / self.output_count if self.output_count else float('nan')
+            self.output_sum = 0.0
+            self.output_count = 0
+            measurement = self.measurement
+        return {
+            'temp_setpoint': self.setpoint,
+            'temp_control': measurement,
+            'peltier_output': mean_output
+        }
@@ -1,16 +1,17 @@
 import csv
 import matplotlib.pyplot as plt
-from typing import List, Tuple, TextIO, Dict, Any
+from typing import List, Tuple, TextIO, Dict, Any, Sequence, Optional
 from matplotlib.figure import Figure
 from matplotlib.axes import Axes
 from matplotlib.lines import Line2D
 from matplotlib.legend import Legend
 
-def create_csv_writer(csv_file: TextIO) -> csv.DictWriter:
+def create_csv_writer(csv_file: TextIO, extra_fields: Sequence[str] = ()) -> csv.DictWriter:
     """Create a CSV DictWriter with predefined headers for sensor data.
     
     Args:
         csv_file: file object opened for writing CSV data
+        extra_fields: additional column names appended after the sensor data
         
     Returns:
         csv.DictWriter: Configured writer object with sensor data headers
@@ -24,7 +25,8 @@ def create_csv_writer(csv_file: TextIO) -> csv.DictWriter:
         'int_press1', 'int_press2', 'int_press3', 'int_press4',
         'int_humid1', 'int_humid2', 'int_humid3', 'int_humid4',
         'ext_temp1', 'ext_temp2', 'ext_temp3', 'ext_temp4',
-        'atm_temp', 'atm_press'
+        'atm_temp', 'atm_press',
+        *extra_fields
     ]
     writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
     writer.writeheader()
@@ -34,7 +36,8 @@ def measure_and_write_sensor_data(
     bioreactor: 'Bioreactor',
     writer: csv.DictWriter,
     elapsed: float,
-    csvfile: TextIO
+    csvfile: TextIO,
+    pyramid: Optional['DownsamplePyramid'] = None
 ) -> Dict[str, float]:
     """Measure all sensor readings and write them to CSV file.
     
@@ -43,13 +46,16 @@ def measure_and_write_sensor_data(
         writer: csv.DictWriter object for writing data to CSV
         elapsed: float, elapsed time in seconds since start
         csvfile: file object for the CSV file being written to
+        pyramid: optional downsampled index updated with each row
     
     This function:
     1. Turns on IR LEDs and lets signal settle
     2. Gets readings from all sensors (optical density, temperature, pressure, humidity)
     3. Turns off IR LEDs
-    4. Writes all sensor data to CSV file
-    5. Flushes CSV buffer to ensure data is written
+    4. Adds readings from any auxiliary sources registered on the bioreactor
+    5. Writes all sensor data to CSV file
+    6. Flushes CSV buffer to ensure data is written
+    7. Folds the row into the downsampled pyramid, if given
 
     Returns:
         Dict[str, float]: Dictionary containing all sensor readings
@@ -82,11 +88,14 @@ def measure_and_write_sensor_data(
         'ext_temp1': ext_temp[0], 'ext_temp2': ext_temp[1],
         'ext_temp3': ext_temp[2], 'ext_temp4': ext_temp[3],
         'atm_temp': atm_temp,
-        'atm_press': atm_press
+        'atm_press': atm_press,
+        **bioreactor.get_aux_data()
     }
     
     writer.writerow(data_row)
     csvfile.flush()
+    if pyramid is not None:
+        pyramid.append(data_row)
     
     return data_row
 